@@ -23,97 +23,213 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
 # THE POSSIBILITY OF SUCH DAMAGE.
 
-import re
-from urllib import parse
+import collections
+import functools
+import ipaddress
+import sys
+import unicodedata
+from urllib.parse import unquote_plus
+
+_BOOLEANS = {"true": True, "True": True, "TRUE": True, "false": False, "False": False, "FALSE": False}
+# like urlsplit, ignore tabs and newlines anywhere in the url
+_UNSAFE_URL_CHARS = str.maketrans("", "", "\t\r\n")
+# and strip leading C0 control characters and spaces
+_C0_CONTROL_OR_SPACE = "".join(map(chr, range(0x21)))
+_HEX_DIGITS = "0123456789abcdefABCDEF"
+
+
+def _copy_config(value):
+    # configs are made only of dicts, lists and scalars, so this is way cheaper than copy.deepcopy
+    if isinstance(value, dict):
+        return {k: _copy_config(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_config(v) for v in value]
+    return value
+
+
+# shared by the parse_url cache, which is why parse_url copies the options dict out of it
+_UrlInfo = collections.namedtuple(
+    "_UrlInfo",
+    ["scheme", "username", "password", "hostname", "port", "path", "fullpath", "options", "location"],
+)
+
+
+def _cast_value(value):
+    # isdigit() is also true for digits int() can't parse, like superscripts
+    if value.isdecimal():
+        return int(value)
+    if len(value) in (4, 5):  # len("true"), len("false")
+        # the usual spellings are found without lowercasing
+        if value in _BOOLEANS:
+            return _BOOLEANS[value]
+        return _BOOLEANS.get(value.lower(), value)
+    return value
+
+
+def _parse_query(query):
+    # same rules as parse.parse_qs: blank values are dropped and the last value wins
+    options = {}
+    for pair in query.split("&"):
+        key, _, value = pair.partition("=")
+        if value:
+            options[unquote_plus(key)] = _cast_value(unquote_plus(value))
+    return options
+
+
+def _split_url(url):
+    # scheme://netloc/path?query#fragment
+    # a dsn always has a netloc, so there is no need for the generic urlsplit machinery
+    scheme, _, rest = url.lstrip(_C0_CONTROL_OR_SPACE).translate(_UNSAFE_URL_CHARS).partition("://")
+    rest, _, _ = rest.partition("#")
+    rest, _, query = rest.partition("?")
+    netloc, slash, path = rest.partition("/")
+    return scheme.lower(), netloc, slash + path, query
+
+
+def _check_netloc(netloc):
+    # same checks as urlsplit, a typo in the host must fail loudly rather than connect somewhere else
+    if "[" in netloc or "]" in netloc:
+        if "[" not in netloc or "]" not in netloc:
+            raise ValueError("Invalid IPv6 URL")
+        hostname = netloc.partition("[")[2].partition("]")[0]
+        if hostname.startswith("v"):
+            # IPvFuture: v<hex digits>.<anything>
+            version, dot, rest = hostname[1:].partition(".")
+            if not (version and dot and rest) or version.strip(_HEX_DIGITS):
+                raise ValueError("IPvFuture address is invalid")
+        elif isinstance(ipaddress.ip_address(hostname), ipaddress.IPv4Address):
+            raise ValueError("An IPv4 address cannot be in brackets")
+    if not netloc.isascii():
+        # characters like \u2100 (a/c) expand to url delimiters under NFKC, as used by IDNA
+        plain = netloc.replace("@", "").replace(":", "").replace("#", "").replace("?", "")
+        normalized = unicodedata.normalize("NFKC", plain)
+        if normalized != plain and any(c in normalized for c in "/?#@:"):
+            raise ValueError(f"netloc '{netloc}' contains invalid characters under NFKC normalization")
+
+
+def _split_netloc(netloc):
+    # [username[:password]@]hostname[:port], as SplitResult's username, password and _hostinfo do,
+    # but the hostname is not lower-cased as it can be a file path
+    userinfo, have_info, hostinfo = netloc.rpartition("@")
+    if have_info:
+        username, have_password, password = userinfo.partition(":")
+        if not have_password:
+            password = None
+    else:
+        username = password = None
+    _, have_open_br, bracketed = hostinfo.partition("[")
+    if have_open_br:
+        hostname, _, port = bracketed.partition("]")
+        _, _, port = port.partition(":")
+    else:
+        hostname, _, port = hostinfo.partition(":")
+    return username, password, hostname, port
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_url(url, multiple_netloc):
+    scheme, netloc, fullpath, query = _split_url(url)
+    _check_netloc(netloc)
+    username, password, hostname, port = _split_netloc(netloc)
+    # cannot have multiple files, so assume that they are always hostnames
+    netlocs = netloc.split(",") if multiple_netloc else []
+    if len(netlocs) > 1:
+        hostname, port = None, None
+    port = int(port) if port else None
+    path = fullpath[1:]
+
+    return _UrlInfo(
+        scheme=scheme,
+        username=username,
+        password=password,
+        hostname=hostname,
+        port=port,
+        path=path,
+        fullpath=fullpath,
+        options=_parse_query(query) if query else {},
+        location=tuple(netlocs) if len(netlocs) > 1 else netloc,
+    )
 
 
 class Service:
-    validation = re.compile(r"^(?P<scheme>\S+)://\S*")
+    cache_size = 256
 
     def config_from_url(self, engine, scheme, url):
         raise NotImplementedError("")
 
     def __init__(self):
         self._schemes = {}
+        self._cache = {}
 
     def validate(self, data):
-        match = self.validation.match(data)
-        return match.groups()[0] if match else None
+        idx = data.find("://")
+        if idx <= 0:
+            return None
+        scheme = data[:idx]
+        # str.split() with no arguments splits on any whitespace
+        if not scheme.isascii() or scheme.split() != [scheme]:
+            return None
+        return scheme
 
     def _parse(self, data):
         if not isinstance(data, str):
             return data
+        return self._parse_str(data)
 
+    def _parse_str(self, data):
         if not data:
             return {}
 
+        try:
+            config = self._cache[data]
+        except KeyError:
+            config = self._parse_uncached(data)
+            if len(self._cache) < self.cache_size:
+                self._cache[data] = config
+        # callers (and django itself) are free to mutate the returned config
+        return _copy_config(config)
+
+    def _parse_uncached(self, data):
         scheme = self.validate(data)
         if scheme is None:
             raise ValueError(f"{data} is invalid, only full dsn urls (scheme://host...) allowed")
-        try:
-            _scheme = self._schemes[scheme]
-        except KeyError:
+        registration = self._schemes.get(scheme)
+        if registration is None:
             raise ValueError(f"{scheme}:// scheme not registered")
-        callback, engine = _scheme["callback"], _scheme["engine"]
+        callback, engine = registration
         return callback(self, engine, scheme, data)
 
     def parse(self, data):
         if isinstance(data, dict):
-            return {k: self._parse(v) for k, v in data.items()}
+            parse_str = self._parse_str
+            return {k: parse_str(v) if isinstance(v, str) else v for k, v in data.items()}
         return self._parse(data)
 
     @staticmethod
     def parse_url(url, *, multiple_netloc=False):
         """
-        A method to parse URLs into components that handles quirks
-        with the stdlib urlparse, such as lower-cased hostnames.
+        A method to parse DSN URLs into components. The URL is split with
+        str.partition rather than urlsplit, so the hostname keeps its case
+        (it can be a file path) and any scheme followed by :// is accepted,
+        while urlsplit's checks on the netloc are kept.
         Also parses querystrings into typed components.
         """
         # This method may be called with an already parsed URL
         if isinstance(url, dict):
             return url
 
-        # scheme://netloc/path;parameters?query#fragment
-        parsed = parse.urlparse(url)
-        # 1) cannot have multiple files, so assume that they are always hostnames
-        # 2) parsed.hostname always returns a lower-cased hostname
-        #    this isn't correct if hostname is a file path, so use '_hostinfo'
-        #    to get the actual host
-        netlocs = parsed.netloc.split(",") if multiple_netloc else []
-        hostname, port = (None, None) if len(netlocs) > 1 else parsed._hostinfo
-        if port:
-            port = int(port)
-
-        query = parse.parse_qs(parsed.query)
-        options = {}
-        for key, values in query.items():
-            value = values[-1]
-            if value.isdigit():
-                value = int(value)
-            elif value.lower() == "true":
-                value = True
-            elif value.lower() == "false":
-                value = False
-            options[key] = value
-        path = parsed.path[1:]
-
-        config = {
-            "scheme": parsed.scheme,
-            "username": parsed.username,
-            "password": parsed.password,
-            "hostname": hostname,
-            "port": port,
-            "path": path,
-            "fullpath": parsed.path,
-            "options": options,
-            "location": netlocs if len(netlocs) > 1 else parsed.netloc,
-        }
+        info = _parse_url(url, multiple_netloc)
+        config = info._asdict()
+        config["options"] = dict(info.options)
+        if isinstance(info.location, tuple):
+            config["location"] = list(info.location)
         return config
 
     def register(self, *args):
         def wrapper(func):
             for scheme, engine in args:
-                self._schemes[scheme] = {"callback": func, "engine": engine}
+                self._schemes[sys.intern(scheme)] = (func, engine)
+            self._cache.clear()
             return func
 
         return wrapper
@@ -46,11 +46,14 @@ class Settings(DjangoSettings):
         self.CACHES = cache.parse(self.CACHES)
 
         # preserve EMAIL_BACKEND backward compatibility
-        if email.validate(self.EMAIL_BACKEND):
-            for k, v in email.parse(self.EMAIL_BACKEND).items():
-                setting = f"EMAIL_{'BACKEND' if k == 'ENGINE' else k}"
-                setattr(self, setting, v)
-                self._explicit_settings.add(setting)
+        email_backend = self.EMAIL_BACKEND
+        if email.validate(email_backend):
+            email_settings = {
+                "EMAIL_BACKEND" if k == "ENGINE" else f"EMAIL_{k}": v for k, v in email.parse(email_backend).items()
+            }
+            for setting, value in email_settings.items():
+                setattr(self, setting, value)
+            self._explicit_settings.update(email_settings)
 
 
 class LazySettings(DjangoLazySettings):
@@ -73,16 +76,14 @@ class LazySettings(DjangoLazySettings):
 
 
 settings = LazySettings()
-_patched = False
 
 
 def patch():
-    global _patched
-    if not _patched:
+    # django.conf itself tells whether it is already patched
+    if conf.Settings is not Settings:
         conf.Settings = Settings
         conf.LazySettings = LazySettings
         conf.settings = settings
-        _patched = True
 
 
 patch()
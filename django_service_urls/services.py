@@ -23,19 +23,38 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
 # THE POSSIBILITY OF SUCH DAMAGE.
 
-from urllib import parse
+import re
+from urllib.parse import unquote
 
 from .base import Service
 
+_MISSING = object()
+# percent-encoded "/" or ":", used to pass unix socket paths as postgres hostname
+_PERCENT_ENCODED_PATH = re.compile(r"%2f|%3a", re.IGNORECASE)
+# smtp schemes enabling USE_TLS/USE_SSL by default
+_SMTP_TLS_SCHEMES = frozenset({"smtps", "smtp+tls"})
+_SMTP_SSL_SCHEMES = frozenset({"smtp+ssl"})
+# sqlite urls for an in-memory database
+_SQLITE_MEMORY_URLS = frozenset({"sqlite://:memory:", "sqlite://"})
+
+
+def _file_path(parsed):
+    path = "/" + parsed["path"]
+    # On windows a path like C:/a/b is parsed with C as the hostname
+    # and a/b/ as the path. Reconstruct the windows path here.
+    if parsed["hostname"]:
+        path = parsed["hostname"] + ":" + path
+    return path
+
 
 class DatabaseService(Service):
     def config_from_url(self, engine, scheme, url):
         parsed = self.parse_url(url)
         return {
             "ENGINE": engine,
-            "NAME": parse.unquote(parsed["path"] or ""),
-            "USER": parse.unquote(parsed["username"] or ""),
-            "PASSWORD": parse.unquote(parsed["password"] or ""),
+            "NAME": unquote(parsed["path"] or ""),
+            "USER": unquote(parsed["username"] or ""),
+            "PASSWORD": unquote(parsed["password"] or ""),
             "HOST": parsed["hostname"],
             "PORT": parsed["port"] or "",
             "OPTIONS": parsed["options"],
@@ -51,20 +70,16 @@ db = DatabaseService()
 )
 def sqlite_config_from_url(backend, engine, scheme, url):
     # These special URLs cannot be parsed correctly.
-    if url in ("sqlite://:memory:", "sqlite://"):
+    if url in _SQLITE_MEMORY_URLS:
         return {
             "ENGINE": engine,
             "NAME": ":memory:",
         }
 
     parsed = backend.parse_url(url)
-    path = "/" + parsed["path"]
-    # On windows a path like C:/a/b is parsed with C as the hostname
-    # and a/b/ as the path. Reconstruct the windows path here.
+    parsed["path"] = _file_path(parsed)
     if parsed["hostname"]:
-        path = f'{parsed["hostname"]}:{path}'
         parsed["location"] = parsed["hostname"] = ""
-    parsed["path"] = path
     return backend.config_from_url(engine, scheme, parsed)
 
 
@@ -77,10 +92,10 @@ def sqlite_config_from_url(backend, engine, scheme, url):
 )
 def postgresql_config_from_url(backend, engine, scheme, url):
     parsed = backend.parse_url(url)
-    host = parsed["hostname"].lower()
     # Handle postgres percent-encoded paths.
-    if "%2f" in host or "%3a" in host:
-        parsed["hostname"] = parse.unquote(parsed["hostname"])
+    hostname = parsed["hostname"]
+    if "%" in hostname and _PERCENT_ENCODED_PATH.search(hostname):
+        parsed["hostname"] = unquote(hostname)
     config = backend.config_from_url(engine, scheme, parsed)
     if "currentSchema" in config["OPTIONS"]:
         value = config["OPTIONS"].pop("currentSchema")
@@ -124,11 +139,12 @@ class CacheService(Service):
                 config["LOCATION"] = parsed["hostname"]
                 if parsed["port"]:
                     config["LOCATION"] = f"{config['LOCATION']}:{parsed['port']}"
+        options = parsed["options"]
         for key in ("timeout", "key_prefix", "version"):
-            if key in parsed["options"]:
-                option = parsed["options"].pop(key)
+            option = options.pop(key, _MISSING)
+            if option is not _MISSING:
                 config[key.upper()] = option
-        config["OPTIONS"] = parsed["options"]
+        config["OPTIONS"] = options
         return config
 
 
@@ -190,12 +206,7 @@ def pylibmccache_config_from_url(backend, engine, scheme, url):
 def file_config_from_url(backend, engine, scheme, url):
     parsed = backend.parse_url(url)
     config = backend.config_from_url(engine, scheme, parsed)
-    path = f"/{parsed['path']}"
-    # On windows a path like C:/a/b is parsed with C as the hostname
-    # and a/b/ as the path. Reconstruct the windows path here.
-    if parsed["hostname"]:
-        path = f"{parsed['hostname']}:{path}"
-    config["LOCATION"] = path
+    config["LOCATION"] = _file_path(parsed)
     return config
 
 
@@ -218,19 +229,22 @@ email = EmailService()
 def email_smtp_config_url(backend, engine, scheme, url):
     config = backend.config_from_url(engine, scheme, url)
     parsed = backend.parse_url(url)
-    return {
-        "HOST": parsed["hostname"] or "localhost",
-        "PORT": parsed["port"] or 25,
-        "HOST_USER": parsed["username"] or "",
-        "HOST_PASSWORD": parsed["password"] or "",
-        "USE_TLS": parsed["options"].get("use_tls", scheme in ("smtps", "smtp+tls")),
-        "USE_SSL": parsed["options"].get("use_ssl", scheme == "smtp+ssl"),
-        "SSL_CERTFILE": parsed["options"].get("ssl_certfile", None),
-        "SSL_KEYFILE": parsed["options"].get("ssl_keyfile", None),
-        "TIMEOUT": parsed["options"].get("timeout", None),
-        "USE_LOCALTIME": parsed["options"].get("use_localtime", False),
-        **config,
-    }
+    options = parsed["options"]
+    config.update(
+        {
+            "HOST": parsed["hostname"] or "localhost",
+            "PORT": parsed["port"] or 25,
+            "HOST_USER": parsed["username"] or "",
+            "HOST_PASSWORD": parsed["password"] or "",
+            "USE_TLS": options.get("use_tls", scheme in _SMTP_TLS_SCHEMES),
+            "USE_SSL": options.get("use_ssl", scheme in _SMTP_SSL_SCHEMES),
+            "SSL_CERTFILE": options.get("ssl_certfile", None),
+            "SSL_KEYFILE": options.get("ssl_keyfile", None),
+            "TIMEOUT": options.get("timeout", None),
+            "USE_LOCALTIME": options.get("use_localtime", False),
+        }
+    )
+    return config
 
 
 @email.register(
@@ -245,16 +259,8 @@ def email_console_config_url(backend, engine, scheme, url):
 )
 def email_file_config_url(backend, engine, scheme, url):
     config = backend.config_from_url(engine, scheme, url)
-    parsed = backend.parse_url(url)
-    path = f"/{parsed['path']}"
-    # On windows a path like C:/a/b is parsed with C as the hostname
-    # and a/b/ as the path. Reconstruct the windows path here.
-    if parsed["hostname"]:
-        path = f"{parsed['hostname']}:{path}"
-    return {
-        "FILE_PATH": path,
-        **config,
-    }
+    config["FILE_PATH"] = _file_path(backend.parse_url(url))
+    return config
 
 
 @email.register(